@@ -6,17 +6,76 @@ Scans Python dependencies against a policy file and blocks builds when
 restricted licenses (e.g., GPL, AGPL) are detected.
 """
 
+import argparse
+import asyncio
+import functools
+import io
 import json
+import os
 import re
+import sqlite3
 import sys
+import time
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 
-import requests
+import aiohttp
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib parser also accepts bytes
+    _json_loads = json.loads
 
 DEPS_DEV_API_BASE = "https://api.deps.dev/v3alpha"
 SYSTEM = "PYPI"
 REQUEST_TIMEOUT = 30
 REQUEST_HEADERS = {"Accept": "application/json"}
+# Upper bound on in-flight Deps.dev requests; the connector limits per-host sockets.
+MAX_CONCURRENCY = 100
+MAX_CONNECTIONS_PER_HOST = 8
+DNS_CACHE_TTL = 300
+# Transient Deps.dev failures are retried with exponential backoff.
+MAX_RETRIES = 3
+RETRY_BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Upper bound on a server-supplied Retry-After so one response cannot stall the scan.
+MAX_RETRY_AFTER = 60.0
+# GetVersionBatch accepts at most 5000 version keys per request; smaller chunks
+# let large scans spread over several concurrent requests.
+VERSION_BATCH_SIZE = 500
+# Licenses of a published (package, version) never change; the default version does.
+CACHE_DIR = Path(os.environ.get("LICENSEGUARD_CACHE_DIR") or Path.home() / ".cache" / "licenseguard")
+DEFAULT_VERSION_TTL = 24 * 60 * 60
+
+# One requirement per line: either an editable (-e / --editable) target, or a
+# PEP 508 name optionally followed by extras, version specifiers, markers or a comment.
+# An exact "==X.Y.Z" pin as the only specifier is captured, including hash-pinned lockfile
+# lines ending in "--hash=..." or a "\" continuation; wildcards and ranges are not.
+# Comment lines and other pip options (-r, --index-url, ...) never match.
+_REQ_LINE_RE = re.compile(
+    r"^[ \t]*(?:"
+    r"(?:-e|--editable)[ \t]+(?P<editable>\S+)"
+    r"|(?P<name>[a-zA-Z0-9][a-zA-Z0-9._-]*)(?=[ \t]*(?:$|[\[<>=!~#;]))"
+    r"(?:[ \t]*(?:\[[^\]\n]*\])?[ \t]*==[ \t]*(?P<pin>[A-Za-z0-9_.+!-]+)[ \t]*(?=$|[;#\\]|--hash=))?"
+    r")",
+    re.M,
+)
+# Lowercase and map "_" to "-" in one pass when normalizing package names.
+_NORM = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ_", "abcdefghijklmnopqrstuvwxyz-")
+# Editable target name: an explicit "#egg=<name>" wins; otherwise a VCS URL ("git+..."
+# or "...@ref") names the package after its last path segment, minus any ".git", with
+# the "scheme://[user@]host" authority, an "@ref" and a "#fragment" skipped.
+_EDITABLE_TARGET_RE = re.compile(
+    r".*?egg=(?P<egg>[a-zA-Z0-9][a-zA-Z0-9._-]*)?"
+    r"|(?=.*(?:@|git\+))(?:[a-zA-Z0-9+.-]+://[^/]*)?(?:[^@#]*/)?"
+    r"(?P<repo>[^/@#]+?)(?i:\.git)?/*(?:@[^#]*)?(?:#.*)?$"
+)
+# SPDX compound expression operators (AND, OR, WITH)
+_SPDX_OP_RE = re.compile(r"\s+(?:AND|OR|WITH)\s+", re.I)
+# Map both SPDX id separators to "-" so prefix boundaries can be found with str.find.
+_SEP_TO_DASH = str.maketrans(".", "-")
 
 
 def load_policy(policy_path: str) -> dict:
@@ -41,181 +100,500 @@ def load_policy(policy_path: str) -> dict:
         print("[LicenseGuard] ERROR: Policy must define 'approved' and 'restricted' as arrays.")
         sys.exit(2)
 
-    return {"approved": approved, "restricted": restricted}
+    # Matching is case-insensitive; normalize the restricted ids once here rather than per license.
+    return {
+        "approved": approved,
+        "restricted": restricted,
+        "restricted_upper": frozenset(r.upper() for r in restricted),
+    }
 
 
-def parse_requirements(requirements_path: str) -> list[str]:
-    """Parse requirements.txt and return normalized package names."""
+def parse_requirements(requirements_path: str) -> list[tuple[str, str | None]]:
+    """
+    Parse requirements.txt and return (normalized package name, pinned version) pairs.
+    The version is None unless the requirement is pinned with "==". A package pinned to
+    different versions (e.g. per environment marker) yields one pair per version.
+    """
     path = Path(requirements_path)
     if not path.exists():
         print(f"[LicenseGuard] ERROR: Requirements file not found: {requirements_path}")
         sys.exit(2)
 
+    seen = set()
     packages = []
-    # PEP 508: package names can be followed by version specifiers, extras, etc.
-    pattern = re.compile(r"^([a-zA-Z0-9][a-zA-Z0-9._-]*)\s*([\[<>=!].*)?$")
-
-    with open(path, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#") or line.startswith("-"):
+    text = path.read_text(encoding="utf-8")
+    for match in _REQ_LINE_RE.finditer(text):
+        name = match.group("name")
+        if name is None:
+            target = _EDITABLE_TARGET_RE.match(match.group("editable"))
+            name = target and (target.group("egg") or target.group("repo"))
+            if not name:
                 continue
-            # Handle -e / --editable and other options
-            if line.startswith("-e ") or line.startswith("--editable "):
-                part = line.split(None, 1)[1]
-                if "egg=" in part:
-                    match = re.search(r"egg=([a-zA-Z0-9][a-zA-Z0-9._-]*)", part)
-                    if match:
-                        packages.append(match.group(1).lower().replace("_", "-"))
-                elif "@" in part or "git+" in part:
-                    pkg = part.rstrip("/").split("/")[-1].replace("_", "-").lower()
-                    if pkg.endswith(".git"):
-                        pkg = pkg[:-4]
-                    packages.append(pkg)
-                continue
-            match = pattern.match(line)
-            if match:
-                name = match.group(1).lower().replace("_", "-")
-                packages.append(name)
+        name = name.translate(_NORM)
+        requirement = (name, match.group("pin"))
+        if requirement not in seen:
+            seen.add(requirement)
+            packages.append(requirement)
 
-    return list(dict.fromkeys(packages))
+    return packages
 
 
-def get_default_version(package_name: str) -> str | None:
-    """Fetch package metadata and return the default (latest) version."""
+def _retry_after(value: str | None) -> float | None:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP-date) into seconds to wait,
+    capped at MAX_RETRY_AFTER. Returns None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+
+async def _request_json(
+    session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, method: str, url: str, **kwargs
+) -> tuple[dict | None, str | None]:
+    """
+    Send a request on the shared session and return (decoded JSON body, ETag).
+    The body is None on 304 Not Modified, i.e. when a conditional request's cached
+    copy is still current.
+    Connection errors, timeouts and RETRY_STATUSES responses are retried up to
+    MAX_RETRIES times, waiting for the response's Retry-After if it sends one and
+    using exponential backoff otherwise; the last failure is raised to the caller.
+    A body that is not valid JSON raises aiohttp.ContentTypeError.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        delay = None
+        try:
+            async with semaphore, session.request(method, url, **kwargs) as resp:
+                if resp.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    resp.raise_for_status()
+                    etag = resp.headers.get("ETag")
+                    if resp.status == 304:
+                        return None, etag
+                    body = await resp.read()
+                    try:
+                        return _json_loads(body), etag
+                    except ValueError as e:
+                        # Surface a non-JSON body like any other bad response so callers skip it.
+                        raise aiohttp.ContentTypeError(
+                            resp.request_info, resp.history, status=resp.status, message=f"invalid JSON body ({e})"
+                        ) from e
+                delay = _retry_after(resp.headers.get("Retry-After"))
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == MAX_RETRIES:
+                raise
+        await asyncio.sleep(RETRY_BACKOFF_FACTOR * 2**attempt if delay is None else delay)
+
+
+async def fetch_default_version(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    package_name: str,
+    cached: tuple[str, str] | None = None,
+) -> tuple[str, str | None] | None:
+    """
+    Fetch package metadata and return (default (latest) version, ETag).
+    If a previously fetched (version, ETag) is given, the request is conditional and
+    the cached version is returned when Deps.dev answers 304 Not Modified.
+    """
     url = f"{DEPS_DEV_API_BASE}/systems/{SYSTEM.lower()}/packages/{package_name}"
+    headers = {"If-None-Match": cached[1]} if cached else None
     try:
-        resp = requests.get(url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.Timeout:
+        data, etag = await _request_json(session, semaphore, "GET", url, headers=headers)
+    except asyncio.TimeoutError:
         print(f"[LicenseGuard] WARNING: API timeout while fetching package '{package_name}'. Skipping.")
         return None
-    except requests.exceptions.HTTPError as e:
-        if e.response is not None and e.response.status_code == 404:
+    except aiohttp.ClientResponseError as e:
+        if e.status == 404:
             print(f"[LicenseGuard] WARNING: Package '{package_name}' not found in registry. Skipping.")
         else:
             print(f"[LicenseGuard] WARNING: API error for '{package_name}' ({e}). Skipping.")
         return None
-    except requests.exceptions.RequestException as e:
+    except aiohttp.ClientError as e:
         print(f"[LicenseGuard] WARNING: Network error for '{package_name}': {e}. Skipping.")
         return None
 
+    if data is None:
+        return cached[0], etag or cached[1]
+
     versions = data.get("versions", [])
     if not versions:
         print(f"[LicenseGuard] WARNING: No versions found for '{package_name}'. Skipping.")
         return None
 
-    for v in versions:
-        if v.get("isDefault"):
-            return v.get("versionKey", {}).get("version")
-    return versions[0].get("versionKey", {}).get("version")
-
-
-def get_licenses(package_name: str, version: str) -> list[str]:
-    """Fetch license information for a specific package version from Deps.dev."""
-    url = f"{DEPS_DEV_API_BASE}/systems/{SYSTEM.lower()}/packages/{package_name}/versions/{version}"
-    try:
-        resp = requests.get(url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.Timeout:
-        print(f"[LicenseGuard] WARNING: API timeout for '{package_name}=={version}'. Skipping.")
-        return []
-    except requests.exceptions.HTTPError as e:
-        if e.response is not None and e.response.status_code == 404:
-            print(f"[LicenseGuard] WARNING: Version '{package_name}=={version}' not found. Skipping.")
-        else:
-            print(f"[LicenseGuard] WARNING: API error for '{package_name}=={version}' ({e}). Skipping.")
-        return []
-    except requests.exceptions.RequestException as e:
-        print(f"[LicenseGuard] WARNING: Network error for '{package_name}=={version}': {e}. Skipping.")
-        return []
-
-    licenses = data.get("licenses", [])
-    if not licenses and data.get("licenseDetails"):
-        licenses = [d.get("spdx", d.get("license", "")) for d in data["licenseDetails"] if d.get("spdx") or d.get("license")]
+    default = next((v for v in versions if v.get("isDefault")), versions[0])
+    version = default.get("versionKey", {}).get("version")
+    return (version, etag) if version else None
+
+
+class LicenseCache:
+    """SQLite-backed cache of Deps.dev lookups that persists across runs."""
+
+    def __init__(self, path: Path) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(path)
+            self._create_tables()
+        except (OSError, sqlite3.Error) as e:
+            print(f"[LicenseGuard] WARNING: Cannot open cache at {path} ({e}). Continuing without it.")
+            self.conn = sqlite3.connect(":memory:")
+            self._create_tables()
+
+    def _create_tables(self) -> None:
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS licenses"
+                " (pkg TEXT, ver TEXT, spdx TEXT, PRIMARY KEY (pkg, ver))"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS default_versions"
+                " (pkg TEXT PRIMARY KEY, ver TEXT, fetched_at REAL, etag TEXT)"
+            )
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(default_versions)")}
+            if "etag" not in columns:
+                self.conn.execute("ALTER TABLE default_versions ADD COLUMN etag TEXT")
+
+    def get_default_version(self, package_name: str) -> tuple[str, str | None, bool] | None:
+        """Return (version, etag, is_fresh) for a cached default version, if any."""
+        row = self.conn.execute(
+            "SELECT ver, etag, fetched_at FROM default_versions WHERE pkg = ?", (package_name,)
+        ).fetchone()
+        if not row:
+            return None
+        ver, etag, fetched_at = row
+        return ver, etag, fetched_at > time.time() - DEFAULT_VERSION_TTL
+
+    def put_default_versions(self, items: list[tuple[str, str, str | None]]) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO default_versions (pkg, ver, fetched_at, etag) VALUES (?, ?, ?, ?)",
+                [(pkg, ver, now, etag) for pkg, ver, etag in items],
+            )
+
+    def get_licenses(self, package_name: str, version: str) -> list[str] | None:
+        row = self.conn.execute(
+            "SELECT spdx FROM licenses WHERE pkg = ? AND ver = ?", (package_name, version)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_licenses(self, items: dict[tuple[str, str], list[str]]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO licenses (pkg, ver, spdx) VALUES (?, ?, ?)",
+                [(pkg, ver, json.dumps(lics)) for (pkg, ver), lics in items.items() if lics],
+            )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _extract_licenses(version_data: dict) -> list[str]:
+    """Return the license identifiers from a Deps.dev Version object."""
+    licenses = version_data.get("licenses", [])
+    if not licenses and version_data.get("licenseDetails"):
+        licenses = [
+            d.get("spdx", d.get("license", ""))
+            for d in version_data["licenseDetails"]
+            if d.get("spdx") or d.get("license")
+        ]
     return [str(l) for l in licenses if l]
 
 
-def _license_matches_restricted(license_expr: str, restricted: str) -> bool:
-    """Check if a single license expression matches a restricted identifier."""
-    r = restricted.upper()
-    # Split SPDX compound expressions (AND, OR, WITH)
-    parts = re.split(r"\s+AND\s+|\s+OR\s+|\s+WITH\s+", license_expr, flags=re.I)
-    for part in parts:
-        part = part.strip().strip("()").upper()
-        if part == r or part.startswith(r + "-") or part.startswith(r + "."):
-            return True
-    return False
+async def _fetch_license_chunk(
+    session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, chunk: list[tuple[str, str]]
+) -> tuple[dict[tuple[str, str], list[str]], set[tuple[str, str]]]:
+    """
+    Fetch one GetVersionBatch request's worth of versions, following pagination.
+    Returns (licenses, versions Deps.dev reported as not found); a failed request
+    reports nothing as not found.
+    """
+    url = f"{DEPS_DEV_API_BASE}/versionbatch"
+    label = f"{len(chunk)} package version(s)"
+    body = {"requests": [{"versionKey": {"system": SYSTEM, "name": pkg, "version": ver}} for pkg, ver in chunk]}
+    results: dict[tuple[str, str], list[str]] = {}
+    page_token = ""
+    while True:
+        if page_token:
+            body["pageToken"] = page_token
+        try:
+            data, _ = await _request_json(session, semaphore, "POST", url, json=body)
+        except asyncio.TimeoutError:
+            print(f"[LicenseGuard] WARNING: API timeout while fetching licenses for {label}. Skipping.")
+            return results, set()
+        except aiohttp.ClientResponseError as e:
+            print(f"[LicenseGuard] WARNING: API error while fetching licenses for {label} ({e}). Skipping.")
+            return results, set()
+        except aiohttp.ClientError as e:
+            print(f"[LicenseGuard] WARNING: Network error while fetching licenses for {label}: {e}. Skipping.")
+            return results, set()
+
+        for entry in data.get("responses", []):
+            key = entry.get("request", {}).get("versionKey", {})
+            version_data = entry.get("version")
+            if version_data:
+                results[(key.get("name"), key.get("version"))] = _extract_licenses(version_data)
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            break
+
+    return results, {key for key in chunk if key not in results}
+
+
+async def fetch_licenses_batch(
+    session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, resolved: list[tuple[str, str]]
+) -> tuple[dict[tuple[str, str], list[str]], set[tuple[str, str]]]:
+    """
+    Fetch license information for many package versions via Deps.dev GetVersionBatch.
+    Versions are split into VERSION_BATCH_SIZE chunks that are fetched concurrently.
+    Returns (mapping of (package, version) to licenses, versions not found in the
+    registry); versions that could not be fetched are in neither.
+    """
+    chunks = [resolved[i : i + VERSION_BATCH_SIZE] for i in range(0, len(resolved), VERSION_BATCH_SIZE)]
+    results: dict[tuple[str, str], list[str]] = {}
+    not_found: set[tuple[str, str]] = set()
+    for chunk_results, chunk_missing in await asyncio.gather(
+        *(_fetch_license_chunk(session, semaphore, c) for c in chunks)
+    ):
+        results.update(chunk_results)
+        not_found |= chunk_missing
+    return results, not_found
+
+
+async def _resolve_default_versions(
+    session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, cache: LicenseCache, names: list[str]
+) -> dict[str, str | None]:
+    """Return the default version of each package, from the cache or Deps.dev."""
+    defaults: dict[str, str | None] = {}
+    stale: dict[str, tuple[str, str]] = {}
+    for p in names:
+        entry = cache.get_default_version(p)
+        defaults[p] = entry[0] if entry and entry[2] else None
+        if entry and not entry[2] and entry[1]:
+            stale[p] = (entry[0], entry[1])
+
+    missing = [p for p in names if not defaults[p]]
+    fetched = await asyncio.gather(*(fetch_default_version(session, semaphore, p, stale.get(p)) for p in missing))
+    cache.put_default_versions([(p, *found) for p, found in zip(missing, fetched) if found])
+    defaults.update((p, found[0] if found else None) for p, found in zip(missing, fetched))
+    return defaults
+
+
+async def _resolve_licenses(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    cache: LicenseCache,
+    resolved: list[tuple[str, str]],
+) -> tuple[dict[tuple[str, str], list[str]], set[tuple[str, str]]]:
+    """Return licenses for (package, version) pairs from the cache, batch-fetching the rest."""
+    licenses: dict[tuple[str, str], list[str]] = {}
+    uncached = []
+    for key in resolved:
+        cached = cache.get_licenses(*key)
+        if cached is None:
+            uncached.append(key)
+        else:
+            licenses[key] = cached
+    if not uncached:
+        return licenses, set()
+    fetched, not_found = await fetch_licenses_batch(session, semaphore, uncached)
+    cache.put_licenses(fetched)
+    licenses.update(fetched)
+    return licenses, not_found
+
+
+async def fetch_all_licenses(
+    requirements: list[tuple[str, str | None]], cache: LicenseCache
+) -> list[tuple[str, str | None, list[str]]]:
+    """
+    Resolve default versions concurrently, then fetch all licenses in batched requests.
+    Pinned requirements use their pinned version, falling back to the default version
+    when Deps.dev does not know the pin; lookups already present in the cache are not
+    sent to Deps.dev, and expired default versions are revalidated with their ETag.
+    Returns one (package, version, licenses) per distinct resolved version, in input
+    order; version is None when unresolved.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONCURRENCY, limit_per_host=MAX_CONNECTIONS_PER_HOST, ttl_dns_cache=DNS_CACHE_TTL
+    )
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    async with aiohttp.ClientSession(headers=REQUEST_HEADERS, connector=connector, timeout=timeout) as session:
+        # Default versions are looked up once per unpinned package name.
+        names = list(dict.fromkeys(p for p, pin in requirements if not pin))
+        defaults = await _resolve_default_versions(session, semaphore, cache, names)
+        resolved = list(dict.fromkeys((p, pin or defaults[p]) for p, pin in requirements))
+        licenses, not_found = await _resolve_licenses(session, semaphore, cache, [k for k in resolved if k[1]])
+
+        # A pin the registry does not know (e.g. "4.2.0" published as "4.2") must not
+        # leave the package unchecked; scan its default version instead.
+        pins = {(p, pin) for p, pin in requirements if pin}
+        unknown_pins = [key for key in resolved if key in not_found and key in pins]
+        if unknown_pins:
+            fallback_names = [p for p in dict.fromkeys(p for p, _ in unknown_pins) if p not in defaults]
+            defaults.update(await _resolve_default_versions(session, semaphore, cache, fallback_names))
+            replacements = {}
+            for p, pin in unknown_pins:
+                if defaults[p]:
+                    print(
+                        f"[LicenseGuard] WARNING: Pinned version '{p}=={pin}' not found; "
+                        f"checking default version '{p}=={defaults[p]}' instead."
+                    )
+                else:
+                    print(f"[LicenseGuard] WARNING: Pinned version '{p}=={pin}' not found and could not be checked.")
+                replacements[(p, pin)] = (p, defaults[p])
+            not_found -= set(unknown_pins)
+            resolved = list(dict.fromkeys(replacements.get(key, key) for key in resolved))
+            retry = [k for k in resolved if k[1] and k not in licenses and k not in not_found]
+            more, more_missing = await _resolve_licenses(session, semaphore, cache, retry)
+            licenses.update(more)
+            not_found |= more_missing
+
+    for p, v in resolved:
+        if (p, v) in not_found:
+            print(f"[LicenseGuard] WARNING: Version '{p}=={v}' not found. Skipping.")
+    return [(p, v, licenses.get((p, v), []) if v else []) for p, v in resolved]
+
+
+@functools.lru_cache(maxsize=4096)
+def _license_parts(license_expr: str) -> tuple[str, ...]:
+    """Split an uppercased SPDX expression into its individual license identifiers."""
+    return tuple(part.strip().strip("()") for part in _SPDX_OP_RE.split(license_expr))
+
+
+def _id_candidates(part: str) -> tuple[str, ...]:
+    """Return the id itself plus each of its prefixes that ends just before a "-" or "."."""
+    seps = part.translate(_SEP_TO_DASH)
+    candidates = [part]
+    i = seps.find("-")
+    while i >= 0:
+        candidates.append(part[:i])
+        i = seps.find("-", i + 1)
+    return tuple(candidates)
+
+
+def _matches_restricted_id(part: str, restricted_upper: frozenset[str]) -> bool:
+    """
+    Check whether an uppercased license id is, or extends, a restricted id.
+    Only the id's own separator-bounded prefixes are looked up, so the cost does not
+    depend on how many ids the policy lists.
+    """
+    return not restricted_upper.isdisjoint(_id_candidates(part))
 
 
-def is_restricted(licenses: list[str], restricted: list[str]) -> tuple[bool, list[str]]:
+def is_restricted(
+    licenses: list[str],
+    restricted_upper: frozenset[str],
+    early: bool = False,
+    verdicts: dict[str, bool] | None = None,
+) -> tuple[bool, list[str]]:
     """
     Check if any license matches a restricted pattern.
+    A license identifier matches when it equals a restricted id or extends it
+    with a "-" or "." suffix (e.g. GPL-3.0 matches GPL-3.0-only).
+    With early=True, stop at the first match when only the verdict is needed.
+    If given, verdicts memoizes the result per license string across calls.
     Returns (is_restricted, matched_licenses).
     """
     matched = []
     for lic in licenses:
-        for r in restricted:
-            if _license_matches_restricted(lic, r):
-                matched.append(lic)
-                break
+        hit = verdicts.get(lic) if verdicts is not None else None
+        if hit is None:
+            hit = any(_matches_restricted_id(part, restricted_upper) for part in _license_parts(lic.upper()))
+            if verdicts is not None:
+                verdicts[lic] = hit
+        if hit:
+            matched.append(lic)
+        if early and matched:
+            break
     return len(matched) > 0, matched
 
 
-def main() -> None:
-    policy_path = Path(__file__).parent / "policy.json"
-    requirements_path = Path(__file__).parent / "requirements.txt"
+def print_violation_report(violation_lines: str, restricted_list: list[str]) -> None:
+    """Write the governance alert for the pre-rendered violation lines in one go."""
+    header = [
+        "",
+        "=" * 60,
+        "  GOVERNANCE ALERT - Restricted License(s) Detected",
+        "=" * 60,
+        "",
+        "The following dependencies use licenses that violate your policy:",
+        "",
+    ]
+    footer = [
+        "",
+        "Action required: Remove or replace these dependencies, or update your",
+        "policy.json if an exception is approved by your legal/compliance team.",
+        "",
+        "Policy restricted licenses: " + ", ".join(restricted_list),
+        "=" * 60,
+    ]
+    sys.stdout.write("\n".join(header) + "\n" + violation_lines + "\n".join(footer) + "\n")
+    sys.stdout.flush()
+
 
-    if len(sys.argv) > 1:
-        policy_path = Path(sys.argv[1])
-    if len(sys.argv) > 2:
-        requirements_path = Path(sys.argv[2])
+def main() -> None:
+    default_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Enforce license policy on Python dependencies.")
+    parser.add_argument("policy_path", nargs="?", type=Path, default=default_dir / "policy.json")
+    parser.add_argument("requirements_path", nargs="?", type=Path, default=default_dir / "requirements.txt")
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        # The GitHub Action passes its fail-fast input through the environment.
+        default=os.environ.get("LICENSEGUARD_FAIL_FAST", "").strip().lower() == "true",
+        help="stop and fail at the first restricted dependency (default: $LICENSEGUARD_FAIL_FAST)",
+    )
+    args = parser.parse_args()
+    policy_path = args.policy_path
+    requirements_path = args.requirements_path
 
     print("[LicenseGuard] Scanning dependencies for license compliance...")
     print(f"[LicenseGuard] Policy: {policy_path.resolve()}")
     print(f"[LicenseGuard] Requirements: {requirements_path.resolve()}")
 
     policy = load_policy(str(policy_path))
-    packages = parse_requirements(str(requirements_path))
+    requirements = parse_requirements(str(requirements_path))
 
-    if not packages:
+    if not requirements:
         print("[LicenseGuard] No dependencies to scan. Exiting successfully.")
         sys.exit(0)
 
     restricted_list = policy["restricted"]
-    violations = []
+    restricted_upper = policy["restricted_upper"]
+    # The distinct license strings across a dependency tree are few, so this stays small.
+    verdict_cache: dict[str, bool] = {}
+    # Violations are rendered as they are found; only the count is kept.
+    violation_lines = io.StringIO()
+    violation_count = 0
+
+    cache = LicenseCache(CACHE_DIR / "licenses.sqlite")
+    try:
+        results = asyncio.run(fetch_all_licenses(requirements, cache))
+    finally:
+        cache.close()
 
-    for pkg in packages:
-        version = get_default_version(pkg)
+    for pkg, version, licenses in results:
         if not version:
             continue
-        licenses = get_licenses(pkg, version)
         if not licenses:
             print(f"[LicenseGuard] INFO: No license metadata for '{pkg}=={version}'. Consider verifying manually.")
             continue
-        is_restr, matched = is_restricted(licenses, restricted_list)
+        is_restr, matched = is_restricted(licenses, restricted_upper, early=args.fail_fast, verdicts=verdict_cache)
         if is_restr:
-            violations.append((pkg, version, matched))
-
-    if violations:
-        print()
-        print("=" * 60)
-        print("  GOVERNANCE ALERT - Restricted License(s) Detected")
-        print("=" * 60)
-        print()
-        print("The following dependencies use licenses that violate your policy:")
-        print()
-        for pkg, version, lics in violations:
-            print(f"  • {pkg}=={version}")
-            print(f"    License(s): {', '.join(lics)}")
-        print()
-        print("Action required: Remove or replace these dependencies, or update your")
-        print("policy.json if an exception is approved by your legal/compliance team.")
-        print()
-        print("Policy restricted licenses:", ", ".join(restricted_list))
-        print("=" * 60)
+            violation_lines.write(f"  • {pkg}=={version}\n    License(s): {', '.join(matched)}\n")
+            violation_count += 1
+            if args.fail_fast:
+                break
+
+    if violation_count:
+        print_violation_report(violation_lines.getvalue(), restricted_list)
         sys.exit(1)
 
     print("[LicenseGuard] All scanned dependencies comply with the license policy.")